@@ -0,0 +1,129 @@
+import torch
+import torch.nn as nn
+from torchvision import models
+import json
+import os
+from .config import (DATASET_DIR, CLASSES_PATH, VALIDATION_SPLIT_PATH,
+                     CASCADE_MODEL_PATH, CASCADE_CONFIG_PATH, CASCADE_CONFIG)
+from .model_utils import imagenet_transform, fit, predict_batches, list_dataset_images
+
+# Usage (from the backend directory, after python -m app.train --validation-split 0.2):
+#   python -m app.cascade      trains the first stage and calibrates its threshold
+
+# --- First-stage preprocessing (low resolution keeps it cheap) ---
+stage1_transform = imagenet_transform(CASCADE_CONFIG["image_size"])
+
+def build_stage1_model(num_classes, pretrained=True):
+    weights = models.MobileNet_V3_Small_Weights.IMAGENET1K_V1 if pretrained else None
+    model = models.mobilenet_v3_small(weights=weights)
+    num_features = model.classifier[-1].in_features
+    model.classifier[-1] = nn.Linear(num_features, num_classes)
+    return model
+
+def load_stage1(classes, device):
+    """
+    Loads the first-stage model and its calibrated threshold.
+
+    Returns (model, threshold), or None when the cascade has not been
+    calibrated for the classes currently served or calibration found no
+    threshold at which the first stage may answer.
+    """
+    if not os.path.exists(CASCADE_MODEL_PATH) or not os.path.exists(CASCADE_CONFIG_PATH):
+        print("Cascade model not found, serving ResNet-50 only")
+        return None
+
+    with open(CASCADE_CONFIG_PATH, "r") as f:
+        cascade_config = json.load(f)
+    if cascade_config["classes"] != classes:
+        print("Cascade was calibrated for different classes, serving ResNet-50 only")
+        return None
+    if cascade_config["threshold"] > 1.0 or cascade_config["expected_escalation_rate"] >= 1.0:
+        # Every image would pay for both stages, which is slower than ResNet-50 alone
+        print("Cascade calibration escalates every image, serving ResNet-50 only")
+        return None
+
+    model = build_stage1_model(len(classes), pretrained=False)
+    model.load_state_dict(torch.load(CASCADE_MODEL_PATH, map_location=device))
+    model = model.to(device)
+    model.eval()
+    print(f"Cascade loaded with threshold {cascade_config['threshold']:.3f}")
+    return model, cascade_config["threshold"]
+
+def calibrate_threshold(stage1_conf, stage1_correct, stage2_correct):
+    """
+    Picks the lowest stage-1 confidence threshold that keeps the cascade's
+    validation accuracy within `max_accuracy_drop` of ResNet-50 alone, so as
+    many images as possible are answered by the first stage.
+    """
+    target = stage2_correct.float().mean().item() - CASCADE_CONFIG["max_accuracy_drop"]
+    threshold = 2.0  # above any softmax confidence, i.e. always escalate
+    for candidate in sorted(set(stage1_conf.tolist()), reverse=True):
+        accepted = stage1_conf >= candidate
+        cascade_correct = torch.where(accepted, stage1_correct, stage2_correct)
+        if cascade_correct.float().mean().item() < target:
+            break
+        threshold = candidate
+
+    accepted = stage1_conf >= threshold
+    return {
+        "threshold": threshold,
+        "val_samples": len(stage1_conf),
+        "expected_escalation_rate": 1.0 - accepted.float().mean().item(),
+        "val_accuracy_resnet": stage2_correct.float().mean().item(),
+        "val_accuracy_cascade": torch.where(accepted, stage1_correct, stage2_correct).float().mean().item()
+    }
+
+def _read_validation_split(class_to_idx):
+    samples = []
+    with open(VALIDATION_SPLIT_PATH, "r") as f:
+        for line in f:
+            path, label = line.rstrip("\n").split("\t")
+            if label in class_to_idx and os.path.exists(path):
+                samples.append((path, class_to_idx[label]))
+    return samples
+
+def _train_stage1(train_samples, num_classes, device):
+    model = build_stage1_model(num_classes).to(device)
+    return fit(model, train_samples, stage1_transform, device, CASCADE_CONFIG["epochs"],
+               CASCADE_CONFIG["batch_size"], CASCADE_CONFIG["lr"], name="Stage 1 epoch")
+
+def main():
+    if not os.path.exists(CLASSES_PATH) or not os.path.exists(VALIDATION_SPLIT_PATH):
+        print("Run python -m app.train --validation-split 0.2 first to produce the classes and validation split")
+        return
+
+    with open(CLASSES_PATH, "r") as f:
+        classes = [line.strip() for line in f.readlines()]
+    class_to_idx = {label: i for i, label in enumerate(classes)}
+
+    val_samples = _read_validation_split(class_to_idx)
+    if not val_samples:
+        print("Validation split is empty, cannot calibrate the cascade")
+        return
+
+    val_paths = {path for path, _ in val_samples}
+    train_samples = [(path, class_to_idx[label])
+                     for path, label in list_dataset_images(DATASET_DIR, class_to_idx)
+                     if path not in val_paths]
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    stage1_model = _train_stage1(train_samples, len(classes), device)
+
+    # ResNet-50 is the served second stage, loaded exactly as for inference
+    from . import predict
+    batch_size = CASCADE_CONFIG["batch_size"]
+    stage1_conf, stage1_correct = predict_batches(stage1_model, val_samples, stage1_transform, device, batch_size)
+    _, stage2_correct = predict_batches(predict.model, val_samples, predict.transform, predict.device, batch_size)
+
+    cascade_config = calibrate_threshold(stage1_conf, stage1_correct, stage2_correct)
+    cascade_config["classes"] = classes
+
+    torch.save(stage1_model.state_dict(), CASCADE_MODEL_PATH)
+    with open(CASCADE_CONFIG_PATH, "w") as f:
+        json.dump(cascade_config, f, indent=2)
+    print(f"Cascade calibrated: {cascade_config}")
+    if cascade_config["expected_escalation_rate"] >= 1.0:
+        print("No threshold kept the accuracy target, the cascade will stay disabled")
+
+if __name__ == "__main__":
+    main()
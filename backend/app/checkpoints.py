@@ -0,0 +1,41 @@
+import os
+import tempfile
+import torch
+
+# Checkpoints are written to a temp file and renamed over the target, so
+# workers that memory-mapped the old file (SHARED_WEIGHTS) keep a valid inode
+# instead of seeing it truncated under them.
+
+def _replace_atomically(path, write):
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix="-" + os.path.basename(path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        # mkstemp creates the file owner-only, keep it readable like a normal save
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def save_checkpoint(state_dict, path):
+    _replace_atomically(path, lambda f: torch.save(state_dict, f))
+
+def save_classes(classes, path):
+    _replace_atomically(path, lambda f: f.write(("\n".join(classes) + "\n").encode("utf-8")))
+
+def save_samples(samples, path):
+    """Writes (image path, label) pairs one per line, tab separated"""
+    lines = "".join(f"{image_path}\t{label}\n" for image_path, label in samples)
+    _replace_atomically(path, lambda f: f.write(lines.encode("utf-8")))
+
+def load_samples(path):
+    samples = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            image_path, label = line.rstrip("\n").split("\t")
+            samples.append((image_path, label))
+    return samples
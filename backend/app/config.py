@@ -9,6 +9,17 @@ UPLOAD_DIR = "uploads"
 DATASET_DIR = "dataset/train"
 MODEL_PATH = "model/latest_model.h5"
 
+# PyTorch checkpoint served by predict.py
+TORCH_MODEL_PATH = "app/models/my_model.pt"
+CLASSES_PATH = "app/models/classes.txt"
+TRAINING_METRICS_PATH = "app/models/training_metrics.json"
+TRAINED_MANIFEST_PATH = "app/models/trained_manifest.txt"  # images the served checkpoint trained on
+VALIDATION_SPLIT_PATH = "app/models/val_split.txt"  # held-out images written by train.py
+
+# Cascade first-stage model and its calibrated threshold
+CASCADE_MODEL_PATH = "app/models/stage1_model.pt"
+CASCADE_CONFIG_PATH = "app/models/cascade.json"
+
 # Create directories
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(DATASET_DIR, exist_ok=True)
@@ -20,4 +31,30 @@ TRAINING_CONFIG = {
     "batch_size": 32,
     "epochs": 5,
     "validation_split": 0.2
-}
\ No newline at end of file
+}
+
+# Incremental (warm-start) training configuration
+INCREMENTAL_CONFIG = {
+    "replay_per_class": 20,  # max previously trained images replayed per class
+    "batch_size": 16,
+    "epochs": 3,
+    "lr": 1e-4,
+    "validation_split": 0.2
+}
+
+# Cascade configuration
+CASCADE_CONFIG = {
+    "image_size": 128,  # low-resolution input for the first stage
+    "batch_size": 32,
+    "epochs": 5,
+    "lr": 1e-3,
+    "max_accuracy_drop": 0.01  # allowed cascade accuracy loss vs ResNet-50 on the validation split
+}
+
+# Inference configuration
+INFERENCE_CONFIG = {
+    # Memory-map the checkpoint so all uvicorn workers share one copy of the weights
+    "shared_weights": os.getenv("SHARED_WEIGHTS", "false").lower() in ("1", "true", "yes"),
+    # Answer confident images with the first-stage model, escalate the rest to ResNet-50
+    "cascade": os.getenv("CASCADE", "false").lower() in ("1", "true", "yes")
+}
@@ -0,0 +1,119 @@
+import os
+import random
+import torch
+import torch.nn as nn
+import torch.optim as optim
+from PIL import Image
+from torchvision import transforms
+from torchvision.datasets.folder import IMG_EXTENSIONS, has_file_allowed_extension
+
+# Preprocessing, datasets and the training loop shared by predict.py, the
+# cascade and the incremental trainer, so the copies cannot drift apart.
+
+def imagenet_transform(size):
+    return transforms.Compose([
+        transforms.Resize((size, size)),
+        transforms.ToTensor(),
+        transforms.Normalize(
+            mean=[0.485, 0.456, 0.406],  # ImageNet normalization
+            std=[0.229, 0.224, 0.225]
+        )
+    ])
+
+class ImageListDataset(torch.utils.data.Dataset):
+    """Dataset over a list of (image path, class index) pairs"""
+
+    def __init__(self, samples, transform):
+        self.samples = samples
+        self.transform = transform
+
+    def __len__(self):
+        return len(self.samples)
+
+    def __getitem__(self, index):
+        path, class_idx = self.samples[index]
+        return self.transform(Image.open(path).convert("RGB")), class_idx
+
+def list_dataset_images(dataset_dir, labels=None):
+    """
+    Lists (image path, label) pairs under dataset_dir/<label>/.
+
+    Paths are built the same way ImageFolder builds them in train.py, and
+    files without an image extension are skipped like ImageFolder does.
+    """
+    samples = []
+    if not os.path.isdir(dataset_dir):
+        return samples
+    for label in sorted(os.listdir(dataset_dir)):
+        label_dir = os.path.join(dataset_dir, label)
+        if not os.path.isdir(label_dir) or (labels is not None and label not in labels):
+            continue
+        for filename in sorted(os.listdir(label_dir)):
+            path = os.path.join(label_dir, filename)
+            if has_file_allowed_extension(path, IMG_EXTENSIONS):
+                samples.append((path, label))
+    return samples
+
+def split_per_class(samples, validation_split, seed=None, min_val_size=0):
+    """
+    Holds out `validation_split` of every class from (item, class) samples.
+
+    Each class keeps at least one training sample, so a class with a single
+    image is never held out entirely. When fewer than `min_val_size` samples
+    were held out, they are taken from the classes with the most training
+    samples left. Returns (train, val).
+    """
+    rng = random.Random(seed)
+    by_class = {}
+    for sample in samples:
+        by_class.setdefault(sample[1], []).append(sample)
+
+    train_by_class, val = {}, []
+    for class_idx in sorted(by_class):
+        items = list(by_class[class_idx])
+        rng.shuffle(items)
+        val_size = min(len(items) - 1, round(len(items) * validation_split))
+        val.extend(items[:val_size])
+        train_by_class[class_idx] = items[val_size:]
+
+    while len(val) < min_val_size:
+        class_idx = max(sorted(train_by_class), key=lambda c: len(train_by_class[c]))
+        if len(train_by_class[class_idx]) < 2:
+            break
+        val.append(train_by_class[class_idx].pop())
+
+    train = [sample for class_idx in sorted(train_by_class) for sample in train_by_class[class_idx]]
+    return train, val
+
+def fit(model, samples, transform, device, epochs, batch_size, lr, name="Epoch"):
+    loader = torch.utils.data.DataLoader(
+        ImageListDataset(samples, transform), batch_size=batch_size, shuffle=True
+    )
+    criterion = nn.CrossEntropyLoss()
+    optimizer = optim.Adam(model.parameters(), lr=lr)
+
+    for epoch in range(epochs):
+        model.train()
+        running_loss = 0.0
+        for imgs, labels in loader:
+            imgs, labels = imgs.to(device), labels.to(device)
+            optimizer.zero_grad()
+            loss = criterion(model(imgs), labels)
+            loss.backward()
+            optimizer.step()
+            running_loss += loss.item()
+        print(f"{name} {epoch+1}/{epochs}, Loss: {running_loss/len(loader):.4f}")
+    return model
+
+def predict_batches(model, samples, transform, device, batch_size):
+    """Returns (confidences, correct) tensors over the samples"""
+    loader = torch.utils.data.DataLoader(ImageListDataset(samples, transform), batch_size=batch_size)
+    confidences, correct = [], []
+    model.eval()
+    with torch.no_grad():
+        for imgs, labels in loader:
+            probs = torch.softmax(model(imgs.to(device)), dim=1).cpu()
+            confidence, predicted_class = torch.max(probs, 1)
+            confidences.append(confidence)
+            correct.append(predicted_class == labels)
+    return torch.cat(confidences), torch.cat(correct)
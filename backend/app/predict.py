@@ -1,12 +1,15 @@
 import torch
 import os
-from torchvision import models, transforms
+import time
+from torchvision import models
 import torch.nn as nn
 from PIL import Image
+from .config import TORCH_MODEL_PATH, CLASSES_PATH, INFERENCE_CONFIG
+from .cascade import load_stage1, stage1_transform
+from .model_utils import imagenet_transform
 
 # Paths
-MODEL_PATH = "app/models/my_model.pt"
-CLASSES_PATH = "app/models/classes.txt"  # optional file to store class names
+MODEL_PATH = TORCH_MODEL_PATH
 NUM_CLASSES = 2  # default fallback
 
 # Device
@@ -21,50 +24,127 @@ else:
     classes = [str(i) for i in range(NUM_CLASSES)]
 
 # --- Model setup ---
-model = models.resnet50(weights=models.ResNet50_Weights.IMAGENET1K_V1)
-num_features = model.fc.in_features
-model.fc = nn.Linear(num_features, NUM_CLASSES)
-model = model.to(device)
-model.eval()
-
-# Load model state
-if os.path.exists(MODEL_PATH):
+def _build_model(num_classes, pretrained=True):
+    weights = models.ResNet50_Weights.IMAGENET1K_V1 if pretrained else None
+    model = models.resnet50(weights=weights)
+    num_features = model.fc.in_features
+    model.fc = nn.Linear(num_features, num_classes)
+    return model
+
+def _load_shared_model():
+    """
+    Builds the model on top of a memory-mapped checkpoint.
+
+    The parameters are views of the checkpoint's pages in the OS page cache,
+    so every worker process that maps the same file shares one physical copy
+    instead of holding a private one.
+    """
+    state_dict = torch.load(MODEL_PATH, map_location="cpu", mmap=True, weights_only=True)
+    # Build on the meta device so no throwaway weights are allocated
+    with torch.device("meta"):
+        shared_model = _build_model(NUM_CLASSES, pretrained=False)
+    shared_model.load_state_dict(state_dict, assign=True)
+    return shared_model
+
+def _report_shared_memory(shared_model):
+    # Every worker beyond the first maps these pages instead of holding its own copy
+    shared_bytes = sum(t.numel() * t.element_size() for t in shared_model.state_dict().values())
+    shared_mb = shared_bytes / (1024 * 1024)
+    print(f"Shared weights: {shared_mb:.1f} MB mapped from {MODEL_PATH}, "
+          f"saving {shared_mb:.1f} MB per additional worker")
+
+model = None
+if INFERENCE_CONFIG["shared_weights"] and device.type == "cpu" and os.path.exists(MODEL_PATH):
     try:
-        model.load_state_dict(torch.load(MODEL_PATH, map_location=device))
-        print("Model loaded successfully")
+        model = _load_shared_model()
+        model.eval()
+        print("Model loaded successfully (memory-mapped)")
+        _report_shared_memory(model)
     except Exception as e:
-        print(f"Error loading model: {e}")
-else:
-    print("Model file not found, using untrained model")
+        print(f"Error memory-mapping model, falling back to private copy: {e}")
+        model = None
+
+if model is None:
+    # ImageNet weights are only worth downloading when there is no checkpoint to replace them
+    model = _build_model(NUM_CLASSES, pretrained=not os.path.exists(MODEL_PATH))
+    model = model.to(device)
+    model.eval()
+
+    # Load model state
+    if os.path.exists(MODEL_PATH):
+        try:
+            model.load_state_dict(torch.load(MODEL_PATH, map_location=device))
+            print("Model loaded successfully")
+        except Exception as e:
+            print(f"Error loading model: {e}")
+    else:
+        print("Model file not found, using untrained model")
+
+# --- Cascade setup ---
+stage1 = load_stage1(classes, device) if INFERENCE_CONFIG["cascade"] else None
+cascade_stats = {"requests": 0, "escalated": 0, "stage1_seconds": 0.0, "stage2_seconds": 0.0}
+
+def get_cascade_stats():
+    """
+    Cascade counters of this worker process only.
+
+    With several uvicorn workers each one answers a share of the traffic, so
+    the pid identifies whose numbers these are.
+    """
+    requests = cascade_stats["requests"]
+    escalated = cascade_stats["escalated"]
+    return {
+        "enabled": stage1 is not None,
+        "pid": os.getpid(),
+        "threshold": stage1[1] if stage1 else None,
+        "requests": requests,
+        "escalated": escalated,
+        "escalation_rate": escalated / requests if requests else 0.0,
+        "stage1_avg_ms": 1000 * cascade_stats["stage1_seconds"] / requests if requests else 0.0,
+        "stage2_avg_ms": 1000 * cascade_stats["stage2_seconds"] / escalated if escalated else 0.0
+    }
+
+transform = imagenet_transform(224)
+
+def _classify(net, net_transform, img):
+    img_tensor = net_transform(img).unsqueeze(0).to(device)
+    with torch.no_grad():
+        outputs = net(img_tensor)
+        probs = torch.softmax(outputs, dim=1)
+        confidence, predicted_class = torch.max(probs, 1)
+    return predicted_class.item(), confidence.item()
 
 # --- Prediction function ---
 def predict(image_path: str):
     """
     Predicts the class and confidence for an image.
 
+    In cascade mode the first-stage model answers when its confidence reaches
+    the calibrated threshold, otherwise the image escalates to ResNet-50.
+
     Args:
         image_path (str): Path to the image
 
     Returns:
         tuple: (predicted_label (str), confidence (float))
     """
-    transform = transforms.Compose([
-        transforms.Resize((224, 224)),
-        transforms.ToTensor(),
-        transforms.Normalize(
-            mean=[0.485, 0.456, 0.406],  # ImageNet normalization
-            std=[0.229, 0.224, 0.225]
-        )
-    ])
-
     # Open image
     img = Image.open(image_path).convert("RGB")
-    img_tensor = transform(img).unsqueeze(0).to(device)
 
-    with torch.no_grad():
-        outputs = model(img_tensor)
-        probs = torch.softmax(outputs, dim=1)
-        confidence, predicted_class = torch.max(probs, 1)
+    if stage1 is not None:
+        stage1_model, threshold = stage1
+        start = time.perf_counter()
+        predicted_class, confidence = _classify(stage1_model, stage1_transform, img)
+        cascade_stats["stage1_seconds"] += time.perf_counter() - start
+        cascade_stats["requests"] += 1
+        if confidence >= threshold:
+            return classes[predicted_class], confidence
+        cascade_stats["escalated"] += 1
+
+    start = time.perf_counter()
+    predicted_class, confidence = _classify(model, transform, img)
+    if stage1 is not None:
+        cascade_stats["stage2_seconds"] += time.perf_counter() - start
 
-    label_name = classes[predicted_class.item()] if classes else str(predicted_class.item())
-    return label_name, confidence.item()
+    label_name = classes[predicted_class] if classes else str(predicted_class)
+    return label_name, confidence
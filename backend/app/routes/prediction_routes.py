@@ -1,6 +1,6 @@
 from fastapi import APIRouter, UploadFile, File
 from ..services.file_service import save_temp_file
-from ..predict import predict
+from ..predict import predict, get_cascade_stats
 from ..image_matcher import image_matcher
 from ..db import insert_image, insert_label
 
@@ -34,4 +34,8 @@ async def predict_with_match(file: UploadFile = File(...)):
         "prediction": label, 
         "confidence": confidence,
         "matched_training_images": formatted_matches
-    }
\ No newline at end of file
+    }
+
+@router.get("/cascade-stats")
+async def cascade_stats_endpoint():
+    return {"status": True, "cascade": get_cascade_stats()}
\ No newline at end of file
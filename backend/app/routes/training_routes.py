@@ -1,10 +1,15 @@
 from fastapi import APIRouter, BackgroundTasks
 from ..services.training_service import train_model_with_labels, train_model, get_training_status
+from ..services.incremental_training_service import train_model_incremental
 
 router = APIRouter()
 
 @router.post("/train")
-async def train_model_endpoint(background_tasks: BackgroundTasks, labels: list = None):
+async def train_model_endpoint(background_tasks: BackgroundTasks, labels: list = None,
+                               incremental: bool = False, compare_full: bool = False):
+    if incremental:
+        background_tasks.add_task(train_model_incremental, labels, compare_full)
+        return {"status": True, "message": "Incremental training started from the served model"}
     if labels:
         background_tasks.add_task(train_model_with_labels, labels)
         return {"status": True, "message": f"Model training started with {len(labels)} selected labels"}
@@ -0,0 +1,184 @@
+import os
+import json
+import time
+import random
+import torch
+import torch.nn as nn
+from torchvision import models
+from ..config import (DATASET_DIR, TORCH_MODEL_PATH, CLASSES_PATH, TRAINED_MANIFEST_PATH,
+                      TRAINING_METRICS_PATH, INCREMENTAL_CONFIG)
+from ..db import insert_model
+from ..checkpoints import save_checkpoint, save_classes, save_samples, load_samples
+from ..model_utils import imagenet_transform, fit, predict_batches, split_per_class, list_dataset_images
+from .training_service import training_status, _move_data_to_trained_tables
+
+device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+# Same preprocessing as predict.py, since we fine-tune the served model
+transform = imagenet_transform(224)
+
+def train_model_incremental(selected_labels=None, compare_full=False):
+    """
+    Fine-tunes the served model on newly uploaded images plus a replay sample.
+
+    Starts from the current checkpoint, appends classifier rows for labels the
+    model has not seen, and trains on the new images together with up to
+    `replay_per_class` previously trained images per known class. "New" means
+    not listed in the checkpoint's trained manifest, which app.train and every
+    incremental run keep next to the checkpoint. Accuracy is
+    measured on a held-out part of the new images. When `compare_full` is set,
+    a fresh ImageNet-initialised model is also trained on all other data and
+    evaluated on the same validation split.
+    """
+    training_status["is_training"] = True
+    training_status["progress"] = "Loading served model..."
+    try:
+        return _train_incremental(selected_labels, compare_full)
+    except Exception as e:
+        print(f"Incremental training error: {e}")
+        training_status["progress"] = f"Incremental training failed: {e}"
+        return None
+    finally:
+        training_status["is_training"] = False
+
+def _train_incremental(selected_labels, compare_full):
+    if not all(os.path.exists(path) for path in (TORCH_MODEL_PATH, CLASSES_PATH, TRAINED_MANIFEST_PATH)):
+        training_status["progress"] = "No served model to warm-start from, run python -m app.train first"
+        return None
+
+    with open(CLASSES_PATH, "r") as f:
+        old_classes = [line.strip() for line in f.readlines()]
+    trained_samples = load_samples(TRAINED_MANIFEST_PATH)
+
+    training_status["progress"] = "Preparing training data..."
+    new_samples = _find_new_samples(trained_samples, selected_labels)
+    if not new_samples:
+        training_status["progress"] = "No new images to train on"
+        return None
+
+    new_labels = sorted({label for _, label in new_samples})
+    classes = old_classes + [label for label in new_labels if label not in old_classes]
+    class_to_idx = {label: i for i, label in enumerate(classes)}
+
+    # Validate only on held-out new images: replay images were already seen by the
+    # served checkpoint, so scoring on them would favour the warm start
+    replay_samples = _sample_replay(trained_samples, old_classes, INCREMENTAL_CONFIG["replay_per_class"])
+    new_train, val_set = split_per_class([(p, class_to_idx[l]) for p, l in new_samples],
+                                         INCREMENTAL_CONFIG["validation_split"], min_val_size=1)
+    train_set = new_train + [(p, class_to_idx[l]) for p, l in replay_samples]
+    if not new_train or not val_set:
+        training_status["progress"] = "Not enough images for a validation split"
+        return None
+
+    training_status["progress"] = "Training model (incremental)..."
+    model = _load_expanded_model(len(old_classes), len(classes))
+    start = time.time()
+    _fit(model, train_set)
+    training_time = time.time() - start
+    accuracy = _evaluate(model, val_set)
+
+    metrics = {
+        "mode": "incremental",
+        "new_samples": len(new_samples),
+        "replay_samples": len(replay_samples),
+        "new_classes": len(classes) - len(old_classes),
+        "train_samples": len(train_set),
+        "val_samples": len(val_set),
+        "training_time_s": round(training_time, 2),
+        "val_accuracy": accuracy
+    }
+
+    if compare_full:
+        training_status["progress"] = "Training full retrain for comparison..."
+        metrics["full_retrain"] = _full_retrain_baseline(trained_samples + new_samples, val_set, class_to_idx)
+        metrics["accuracy_delta"] = accuracy - metrics["full_retrain"]["val_accuracy"]
+        metrics["speedup"] = metrics["full_retrain"]["training_time_s"] / max(training_time, 1e-6)
+
+    training_status["progress"] = "Saving model..."
+    save_checkpoint(model.state_dict(), TORCH_MODEL_PATH)
+    save_classes(classes, CLASSES_PATH)
+    # Held-out images stay out of the manifest, so the next run still treats them as new
+    save_samples(trained_samples + [(path, classes[class_idx]) for path, class_idx in new_train],
+                 TRAINED_MANIFEST_PATH)
+    model_id = insert_model("incremental_model", TORCH_MODEL_PATH)
+    metrics["model_id"] = model_id
+    _record_metrics(metrics)
+
+    training_status["progress"] = "Moving data to trained tables..."
+    _move_data_to_trained_tables(new_labels, model_id)
+
+    training_status["progress"] = "Training completed!"
+    return model
+
+def _find_new_samples(trained_samples, selected_labels):
+    """Dataset images the served checkpoint has not been trained on"""
+    trained_paths = {path for path, _ in trained_samples}
+    return [(path, label) for path, label in list_dataset_images(DATASET_DIR, selected_labels or None)
+            if path not in trained_paths]
+
+def _sample_replay(trained_samples, labels, per_class):
+    """Draws the same bounded number of trained images from every known class"""
+    by_label = {}
+    for path, label in trained_samples:
+        if os.path.exists(path):
+            by_label.setdefault(label, []).append(path)
+
+    samples = []
+    for label in labels:
+        paths = by_label.get(label, [])
+        samples.extend((path, label) for path in random.sample(paths, min(per_class, len(paths))))
+    return samples
+
+def _load_expanded_model(num_old_classes, num_classes):
+    model = models.resnet50(weights=None)
+    num_features = model.fc.in_features
+    model.fc = nn.Linear(num_features, num_old_classes)
+    model.load_state_dict(torch.load(TORCH_MODEL_PATH, map_location="cpu"))
+
+    if num_classes > num_old_classes:
+        # Keep the learned rows for existing classes, new rows start from the default init
+        old_fc = model.fc
+        model.fc = nn.Linear(num_features, num_classes)
+        with torch.no_grad():
+            model.fc.weight[:num_old_classes] = old_fc.weight
+            model.fc.bias[:num_old_classes] = old_fc.bias
+
+    return model.to(device)
+
+def _fit(model, samples):
+    fit(model, samples, transform, device, INCREMENTAL_CONFIG["epochs"],
+        INCREMENTAL_CONFIG["batch_size"], INCREMENTAL_CONFIG["lr"])
+
+def _evaluate(model, samples):
+    _, correct = predict_batches(model, samples, transform, device, INCREMENTAL_CONFIG["batch_size"])
+    return correct.float().mean().item()
+
+def _full_retrain_baseline(all_samples, val_set, class_to_idx):
+    val_paths = {path for path, _ in val_set}
+    train_set = [(p, class_to_idx[l]) for p, l in all_samples
+                 if p not in val_paths and l in class_to_idx and os.path.exists(p)]
+
+    model = models.resnet50(weights=models.ResNet50_Weights.IMAGENET1K_V1)
+    model.fc = nn.Linear(model.fc.in_features, len(class_to_idx))
+    model = model.to(device)
+
+    start = time.time()
+    _fit(model, train_set)
+    training_time = time.time() - start
+    return {
+        "train_samples": len(train_set),
+        "val_samples": len(val_set),
+        "training_time_s": round(training_time, 2),
+        "val_accuracy": _evaluate(model, val_set)
+    }
+
+def _record_metrics(metrics):
+    training_status["metrics"] = metrics
+    history = []
+    if os.path.exists(TRAINING_METRICS_PATH):
+        with open(TRAINING_METRICS_PATH, "r") as f:
+            history = json.load(f)
+    history.append(metrics)
+    with open(TRAINING_METRICS_PATH, "w") as f:
+        json.dump(history, f, indent=2)
+    print(f"Training metrics: {metrics}")
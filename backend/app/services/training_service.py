@@ -1,12 +1,11 @@
 import os
 import glob
 import shutil
-from tensorflow.keras.preprocessing.image import ImageDataGenerator
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense, Flatten, Conv2D, MaxPooling2D
 from ..config import DATASET_DIR, MODEL_PATH, TRAINING_CONFIG
 from ..db import insert_model, insert_trained_image, insert_trained_label, cursor
 
+# TensorFlow is imported inside the training functions so that uvicorn workers
+# which only serve predictions never load it.
 training_status = {"is_training": False, "progress": ""}
 
 def get_training_status():
@@ -53,6 +52,7 @@ def _train_model_from_directory_with_labels(dataset_dir, selected_labels):
         return None
 
     training_status["progress"] = "Loading training data..."
+    from tensorflow.keras.preprocessing.image import ImageDataGenerator
     datagen = ImageDataGenerator(rescale=1./255, validation_split=TRAINING_CONFIG["validation_split"])
     train_gen = datagen.flow_from_directory(
         dataset_dir, 
@@ -100,6 +100,7 @@ def _train_model_from_directory(dataset_dir):
     if total_images < 2:
         return None
 
+    from tensorflow.keras.preprocessing.image import ImageDataGenerator
     datagen = ImageDataGenerator(rescale=1./255, validation_split=TRAINING_CONFIG["validation_split"])
     train_gen = datagen.flow_from_directory(
         dataset_dir, 
@@ -127,6 +128,9 @@ def _train_model_from_directory(dataset_dir):
     return model
 
 def _create_model(num_classes):
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import Dense, Flatten, Conv2D, MaxPooling2D
+
     model = Sequential([
         Conv2D(32, (3,3), activation='relu', input_shape=(64,64,3)),
         MaxPooling2D(2,2),
@@ -1,43 +1,34 @@
 import torch
 import torch.nn as nn
 import torch.optim as optim
+import torch.distributed as dist
+import torch.multiprocessing as mp
+from torch.nn.parallel import DistributedDataParallel
+from torch.utils.data.distributed import DistributedSampler
 from torchvision import datasets, models, transforms
+import argparse
 import os
 import glob
+from .config import (DATASET_DIR, TORCH_MODEL_PATH, CLASSES_PATH, VALIDATION_SPLIT_PATH,
+                     TRAINED_MANIFEST_PATH)
+from .checkpoints import save_checkpoint, save_classes, save_samples
+from .model_utils import split_per_class
+
+# Usage (from the backend directory):
+#   python -m app.train                 single process
+#   python -m app.train --nproc 8       8 local data-parallel processes
+#   python -m app.train --validation-split 0.2
+#                                       hold out 20% of each class for cascade calibration
+#   torchrun --nnodes 2 --nproc_per_node 8 --rdzv_backend c10d \
+#       --rdzv_endpoint <host>:29500 -m app.train      across nodes
 
 # --- Configuration ---
-data_dir = "../dataset/train"  # dataset folder with label subfolders
-model_save_path = "app/models/my_model.pt"
-batch_size = 16
+data_dir = DATASET_DIR  # dataset folder with label subfolders
+model_save_path = TORCH_MODEL_PATH
+batch_size = 16  # per process, the global batch is batch_size * world_size
 epochs = 5
 lr = 1e-4
-
-# --- Ensure dataset exists ---
-if not os.path.exists(data_dir):
-    print(f"Dataset directory not found: {data_dir}")
-    print("Create folder structure: dataset/train/<label>/image.jpg")
-    exit(0)
-
-# --- Automatically find classes (folders) ---
-classes = [d for d in os.listdir(data_dir) if os.path.isdir(os.path.join(data_dir, d))]
-if not classes:
-    print("No label folders found in dataset/train")
-    exit(0)
-
-# --- Check for empty folders ---
-valid_classes = []
-for c in classes:
-    imgs = glob.glob(os.path.join(data_dir, c, "*"))
-    if len(imgs) > 0:
-        valid_classes.append(c)
-    else:
-        print(f"Skipping empty class folder: {c}")
-
-if not valid_classes:
-    print("No images found in any class folder. Exiting...")
-    exit(0)
-
-print(f"Detected classes: {valid_classes}")
+split_seed = 42  # identical on every rank so all processes hold out the same images
 
 # --- Transforms ---
 transform = transforms.Compose([
@@ -45,41 +36,170 @@ transform = transforms.Compose([
     transforms.ToTensor(),
 ])
 
-# --- Dataset ---
-train_dataset = datasets.ImageFolder(data_dir, transform=transform)
-print("Mapping of classes to indices:", train_dataset.class_to_idx)
-
-num_classes = len(train_dataset.classes)
-train_loader = torch.utils.data.DataLoader(train_dataset, batch_size=batch_size, shuffle=True)
-
-# --- Device ---
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-
-# --- Model ---
-model = models.resnet50(weights=models.ResNet50_Weights.IMAGENET1K_V1)
-num_features = model.fc.in_features
-model.fc = nn.Linear(num_features, num_classes)
-model = model.to(device)
-
-# --- Loss and optimizer ---
-criterion = nn.CrossEntropyLoss()
-optimizer = optim.Adam(model.parameters(), lr=lr)
-
-# --- Training loop ---
-for epoch in range(epochs):
-    model.train()
-    running_loss = 0.0
-    for imgs, labels in train_loader:
-        imgs, labels = imgs.to(device), labels.to(device)
-        optimizer.zero_grad()
-        outputs = model(imgs)
-        loss = criterion(outputs, labels)
-        loss.backward()
-        optimizer.step()
-        running_loss += loss.item()
-    print(f"Epoch {epoch+1}/{epochs}, Loss: {running_loss/len(train_loader):.4f}")
-
-# --- Save model ---
-os.makedirs(os.path.dirname(model_save_path), exist_ok=True)
-torch.save(model.state_dict(), model_save_path)
-print("Model saved to", model_save_path)
+def find_valid_classes():
+    # --- Ensure dataset exists ---
+    if not os.path.exists(data_dir):
+        print(f"Dataset directory not found: {data_dir}")
+        print("Create folder structure: dataset/train/<label>/image.jpg")
+        return []
+
+    # --- Automatically find classes (folders) ---
+    classes = [d for d in os.listdir(data_dir) if os.path.isdir(os.path.join(data_dir, d))]
+    if not classes:
+        print("No label folders found in dataset/train")
+        return []
+
+    # --- Check for empty folders ---
+    valid_classes = []
+    for c in classes:
+        imgs = glob.glob(os.path.join(data_dir, c, "*"))
+        if len(imgs) > 0:
+            valid_classes.append(c)
+        else:
+            print(f"Skipping empty class folder: {c}")
+
+    if not valid_classes:
+        print("No images found in any class folder. Exiting...")
+    return valid_classes
+
+def train(rank=0, world_size=1, validation_split=0.0):
+    """
+    Trains ResNet-50 on the dataset, data-parallel when world_size > 1.
+
+    Every process reads its own shard of the image manifest and gradients are
+    all-reduced over the gloo backend after each backward pass. Only rank 0
+    writes the checkpoint and registers it in the database.
+
+    A non-zero validation_split holds out that share of every class (keeping
+    at least one training image per class) for cascade calibration. The held
+    out images are not used to train the served model.
+    """
+    distributed = world_size > 1
+    # torchrun sets LOCAL_RANK, mp.spawn only runs on one node so the rank is local
+    local_rank = int(os.getenv("LOCAL_RANK", rank))
+    if distributed:
+        dist.init_process_group("gloo", rank=rank, world_size=world_size)
+        # Split the cores between the processes on this node instead of oversubscribing
+        local_world_size = int(os.getenv("LOCAL_WORLD_SIZE", world_size))
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // local_world_size))
+
+    try:
+        _train(rank, local_rank, world_size, distributed, validation_split)
+    finally:
+        if distributed:
+            dist.destroy_process_group()
+
+def _train(rank, local_rank, world_size, distributed, validation_split):
+    valid_classes = find_valid_classes()
+    if not valid_classes:
+        return
+
+    if rank == 0:
+        print(f"Detected classes: {valid_classes}")
+
+    # --- Dataset ---
+    full_dataset = datasets.ImageFolder(data_dir, transform=transform)
+    if rank == 0:
+        print("Mapping of classes to indices:", full_dataset.class_to_idx)
+
+    train_indices, val_indices = split_per_class(
+        [(i, class_idx) for i, (_, class_idx) in enumerate(full_dataset.samples)],
+        validation_split, seed=split_seed
+    )
+    train_dataset = torch.utils.data.Subset(full_dataset, [i for i, _ in train_indices])
+    val_samples = [full_dataset.samples[i] for i, _ in val_indices]
+
+    num_classes = len(full_dataset.classes)
+    sampler = DistributedSampler(train_dataset, num_replicas=world_size, rank=rank, shuffle=True) if distributed else None
+    train_loader = torch.utils.data.DataLoader(
+        train_dataset, batch_size=batch_size, shuffle=sampler is None, sampler=sampler
+    )
+
+    # --- Device ---
+    # gloo all-reduce runs on CPU tensors, so distributed runs stay on the CPU
+    device = torch.device("cuda" if torch.cuda.is_available() and not distributed else "cpu")
+
+    # --- Model ---
+    if distributed and local_rank != 0:
+        dist.barrier()  # let one process per node download the ImageNet weights first
+    model = models.resnet50(weights=models.ResNet50_Weights.IMAGENET1K_V1)
+    if distributed and local_rank == 0:
+        dist.barrier()
+    num_features = model.fc.in_features
+    model.fc = nn.Linear(num_features, num_classes)
+    model = model.to(device)
+    if distributed:
+        model = DistributedDataParallel(model)
+
+    # --- Loss and optimizer ---
+    criterion = nn.CrossEntropyLoss()
+    optimizer = optim.Adam(model.parameters(), lr=lr)
+
+    # --- Training loop ---
+    for epoch in range(epochs):
+        if sampler is not None:
+            sampler.set_epoch(epoch)
+        model.train()
+        running_loss = 0.0
+        for imgs, labels in train_loader:
+            imgs, labels = imgs.to(device), labels.to(device)
+            optimizer.zero_grad()
+            outputs = model(imgs)
+            loss = criterion(outputs, labels)
+            loss.backward()
+            optimizer.step()
+            running_loss += loss.item()
+
+        loss_stats = torch.tensor([running_loss, len(train_loader)], dtype=torch.float64)
+        if distributed:
+            dist.all_reduce(loss_stats)
+        if rank == 0:
+            print(f"Epoch {epoch+1}/{epochs}, Loss: {(loss_stats[0] / loss_stats[1]).item():.4f}")
+
+    # --- Save model ---
+    if rank == 0:
+        state_dict = model.module.state_dict() if distributed else model.state_dict()
+        # Replaced atomically, servers may have the current checkpoint memory-mapped
+        save_checkpoint(state_dict, model_save_path)
+        save_classes(full_dataset.classes, CLASSES_PATH)
+        # The incremental trainer treats every image not listed here as new
+        train_samples = [full_dataset.samples[i] for i in train_dataset.indices]
+        save_samples([(path, full_dataset.classes[c]) for path, c in train_samples], TRAINED_MANIFEST_PATH)
+        print("Model saved to", model_save_path)
+        if val_samples:
+            save_samples([(path, full_dataset.classes[c]) for path, c in val_samples], VALIDATION_SPLIT_PATH)
+            print(f"Validation split ({len(val_samples)} images) saved to", VALIDATION_SPLIT_PATH)
+        elif os.path.exists(VALIDATION_SPLIT_PATH):
+            # A previous split now overlaps this model's training data
+            os.remove(VALIDATION_SPLIT_PATH)
+
+        # Imported here so only rank 0 opens a database connection
+        from .db import insert_model
+        model_id = insert_model("distributed_model" if distributed else "latest_model", model_save_path)
+        print(f"Registered model {model_id} trained on {world_size} process(es)")
+
+    if distributed:
+        dist.barrier()
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the ResNet-50 classifier")
+    parser.add_argument("--nproc", type=int, default=1,
+                        help="number of local data-parallel processes to spawn")
+    parser.add_argument("--validation-split", type=float, default=0.0,
+                        help="share of each class held out for cascade calibration, "
+                             "these images are not used to train the served model")
+    args = parser.parse_args()
+
+    if "WORLD_SIZE" in os.environ:
+        # Launched by torchrun, which sets the rank and rendezvous variables
+        train(int(os.environ["RANK"]), int(os.environ["WORLD_SIZE"]), args.validation_split)
+    elif args.nproc > 1:
+        os.environ.setdefault("MASTER_ADDR", "127.0.0.1")
+        os.environ.setdefault("MASTER_PORT", "29500")
+        os.environ["LOCAL_WORLD_SIZE"] = str(args.nproc)
+        mp.spawn(train, args=(args.nproc, args.validation_split), nprocs=args.nproc)
+    else:
+        train(validation_split=args.validation_split)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import json
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("torchvision")
+
+from app import cascade
+
+def _tensors(conf, stage1_correct, stage2_correct):
+    return torch.tensor(conf), torch.tensor(stage1_correct), torch.tensor(stage2_correct)
+
+# test the lowest threshold that keeps the accuracy target is chosen
+def test_calibrate_threshold_picks_lowest_safe_threshold(monkeypatch):
+    monkeypatch.setitem(cascade.CASCADE_CONFIG, "max_accuracy_drop", 0.0)
+    result = cascade.calibrate_threshold(*_tensors(
+        [0.99, 0.9, 0.6, 0.4], [True, True, False, False], [True, True, True, True]
+    ))
+
+    assert result["threshold"] == pytest.approx(0.9)
+    assert result["expected_escalation_rate"] == pytest.approx(0.5)
+    assert result["val_accuracy_cascade"] == pytest.approx(1.0)
+    assert result["val_samples"] == 4
+
+# test the allowed accuracy drop lets more images stop at the first stage
+def test_calibrate_threshold_uses_accuracy_drop(monkeypatch):
+    monkeypatch.setitem(cascade.CASCADE_CONFIG, "max_accuracy_drop", 0.25)
+    result = cascade.calibrate_threshold(*_tensors(
+        [0.9, 0.8, 0.7, 0.6], [True, False, True, False], [True, True, True, True]
+    ))
+
+    assert result["threshold"] == pytest.approx(0.7)
+    assert result["expected_escalation_rate"] == pytest.approx(0.25)
+    assert result["val_accuracy_cascade"] == pytest.approx(0.75)
+
+# test the sentinel when no threshold meets the target
+def test_calibrate_threshold_escalates_everything_when_unsafe(monkeypatch):
+    monkeypatch.setitem(cascade.CASCADE_CONFIG, "max_accuracy_drop", 0.0)
+    result = cascade.calibrate_threshold(*_tensors([0.95, 0.5], [False, True], [True, True]))
+
+    assert result["threshold"] > 1.0
+    assert result["expected_escalation_rate"] == 1.0
+    assert result["val_accuracy_cascade"] == result["val_accuracy_resnet"]
+
+def _write_cascade(tmp_path, monkeypatch, threshold, escalation_rate):
+    model_path = tmp_path / "stage1_model.pt"
+    config_path = tmp_path / "cascade.json"
+    torch.save(cascade.build_stage1_model(2, pretrained=False).state_dict(), model_path)
+    config_path.write_text(json.dumps({
+        "threshold": threshold,
+        "expected_escalation_rate": escalation_rate,
+        "classes": ["cat", "dog"]
+    }))
+    monkeypatch.setattr(cascade, "CASCADE_MODEL_PATH", str(model_path))
+    monkeypatch.setattr(cascade, "CASCADE_CONFIG_PATH", str(config_path))
+
+# test a calibrated cascade is loaded with its threshold
+def test_load_stage1_returns_model_and_threshold(tmp_path, monkeypatch):
+    _write_cascade(tmp_path, monkeypatch, 0.8, 0.3)
+    stage1 = cascade.load_stage1(["cat", "dog"], torch.device("cpu"))
+
+    assert stage1 is not None
+    assert stage1[1] == 0.8
+
+# test the cascade stays off when calibration escalates everything
+def test_load_stage1_skips_sentinel_threshold(tmp_path, monkeypatch):
+    _write_cascade(tmp_path, monkeypatch, 2.0, 1.0)
+    assert cascade.load_stage1(["cat", "dog"], torch.device("cpu")) is None
+
+# test the cascade stays off when the served classes changed
+def test_load_stage1_skips_other_classes(tmp_path, monkeypatch):
+    _write_cascade(tmp_path, monkeypatch, 0.8, 0.3)
+    assert cascade.load_stage1(["cat", "dog", "bird"], torch.device("cpu")) is None
@@ -0,0 +1,91 @@
+import importlib
+import sys
+import types
+import pytest
+
+torch = pytest.importorskip("torch")
+torchvision = pytest.importorskip("torchvision")
+
+@pytest.fixture
+def service(monkeypatch):
+    # app.db connects to MySQL on import, so give the service a stand-in
+    fake_db = types.ModuleType("app.db")
+    fake_db.cursor = None
+    for name in ("insert_model", "insert_trained_image", "insert_trained_label"):
+        setattr(fake_db, name, None)
+    monkeypatch.setitem(sys.modules, "app.db", fake_db)
+    for name in ("app.services.training_service", "app.services.incremental_training_service"):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+
+    yield importlib.import_module("app.services.incremental_training_service")
+
+    for name in ("app.services.training_service", "app.services.incremental_training_service"):
+        sys.modules.pop(name, None)
+
+def _save_resnet(path, num_classes):
+    model = torchvision.models.resnet50(weights=None)
+    model.fc = torch.nn.Linear(model.fc.in_features, num_classes)
+    torch.save(model.state_dict(), path)
+    return model
+
+# test the classifier head grows while keeping the learned rows
+def test_load_expanded_model_keeps_old_rows(service, tmp_path, monkeypatch):
+    checkpoint = tmp_path / "my_model.pt"
+    old_model = _save_resnet(checkpoint, 2)
+    monkeypatch.setattr(service, "TORCH_MODEL_PATH", str(checkpoint))
+    monkeypatch.setattr(service, "device", torch.device("cpu"))
+
+    model = service._load_expanded_model(2, 5)
+
+    assert model.fc.out_features == 5
+    assert torch.equal(model.fc.weight[:2], old_model.fc.weight)
+    assert torch.equal(model.fc.bias[:2], old_model.fc.bias)
+    assert torch.equal(model.conv1.weight, old_model.conv1.weight)
+
+# test no expansion when there are no new labels
+def test_load_expanded_model_without_new_classes(service, tmp_path, monkeypatch):
+    checkpoint = tmp_path / "my_model.pt"
+    old_model = _save_resnet(checkpoint, 3)
+    monkeypatch.setattr(service, "TORCH_MODEL_PATH", str(checkpoint))
+    monkeypatch.setattr(service, "device", torch.device("cpu"))
+
+    model = service._load_expanded_model(3, 3)
+
+    assert model.fc.out_features == 3
+    assert torch.equal(model.fc.weight, old_model.fc.weight)
+
+def _touch(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"")
+    return str(path)
+
+# test replay draws at most per_class trained images from every class
+def test_sample_replay_per_class_limit(service, tmp_path):
+    trained = [(_touch(tmp_path / f"cat{i}.png"), "cat") for i in range(5)]
+    trained.append((_touch(tmp_path / "dog0.png"), "dog"))
+
+    samples = service._sample_replay(trained, ["cat", "dog", "bird"], 2)
+
+    assert [label for _, label in samples].count("cat") == 2
+    assert [label for _, label in samples].count("dog") == 1
+    assert len(samples) == 3
+    assert set(samples) <= set(trained)
+
+# test replay skips images missing from disk
+def test_sample_replay_skips_missing_files(service, tmp_path):
+    existing = _touch(tmp_path / "cat0.png")
+    trained = [(existing, "cat"), (str(tmp_path / "gone.png"), "cat")]
+
+    assert service._sample_replay(trained, ["cat"], 5) == [(existing, "cat")]
+
+# test new images are the dataset images missing from the trained manifest
+def test_find_new_samples_uses_trained_manifest(service, tmp_path, monkeypatch):
+    dataset_dir = tmp_path / "train"
+    seen = _touch(dataset_dir / "cat" / "a.png")
+    unseen = _touch(dataset_dir / "cat" / "b.png")
+    new_label = _touch(dataset_dir / "dog" / "c.jpg")
+    _touch(dataset_dir / "dog" / ".DS_Store")
+    monkeypatch.setattr(service, "DATASET_DIR", str(dataset_dir))
+
+    assert service._find_new_samples([(seen, "cat")], None) == [(unseen, "cat"), (new_label, "dog")]
+    assert service._find_new_samples([(seen, "cat")], ["dog"]) == [(new_label, "dog")]
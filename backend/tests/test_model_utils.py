@@ -0,0 +1,40 @@
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("torchvision")
+
+from app.model_utils import split_per_class
+
+def _samples(counts):
+    return [(f"{label}{i}.png", label) for label, count in counts.items() for i in range(count)]
+
+# test every class keeps a training image and small classes are never held out
+def test_split_per_class_keeps_training_image_per_class():
+    train, val = split_per_class(_samples({0: 10, 1: 1, 2: 2}), 0.2, seed=0)
+
+    assert {label for _, label in train} == {0, 1, 2}
+    assert [label for _, label in val] == [0, 0]
+    assert len(train) + len(val) == 13
+
+# test the split is disjoint and repeatable for the same seed
+def test_split_per_class_is_disjoint_and_seeded():
+    samples = _samples({0: 7, 1: 5})
+    train, val = split_per_class(samples, 0.3, seed=42)
+
+    assert not {path for path, _ in train} & {path for path, _ in val}
+    assert sorted(train + val) == sorted(samples)
+    assert split_per_class(samples, 0.3, seed=42) == (train, val)
+
+# test min_val_size borrows from the largest class without emptying it
+def test_split_per_class_min_val_size():
+    train, val = split_per_class(_samples({0: 1, 1: 2}), 0.2, seed=0, min_val_size=1)
+
+    assert [label for _, label in val] == [1]
+    assert sorted(label for _, label in train) == [0, 1]
+
+# test min_val_size gives up when every class has a single image
+def test_split_per_class_min_val_size_single_images():
+    train, val = split_per_class(_samples({0: 1, 1: 1}), 0.2, min_val_size=1)
+
+    assert val == []
+    assert len(train) == 2
@@ -0,0 +1,58 @@
+import importlib
+import sys
+import pytest
+
+torch = pytest.importorskip("torch")
+torchvision = pytest.importorskip("torchvision")
+
+import app.config
+
+def _write_checkpoint(tmp_path, num_classes, class_names):
+    models_dir = tmp_path / "app" / "models"
+    models_dir.mkdir(parents=True)
+    model = torchvision.models.resnet50(weights=None)
+    model.fc = torch.nn.Linear(model.fc.in_features, num_classes)
+    torch.save(model.state_dict(), models_dir / "my_model.pt")
+    (models_dir / "classes.txt").write_text("\n".join(class_names) + "\n")
+    return model
+
+@pytest.fixture
+def load_predict(tmp_path, monkeypatch):
+    # predict.py loads the model on import from paths relative to the backend directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setitem(app.config.INFERENCE_CONFIG, "shared_weights", True)
+    monkeypatch.setitem(app.config.INFERENCE_CONFIG, "cascade", False)
+    monkeypatch.delitem(sys.modules, "app.predict", raising=False)
+
+    yield lambda: importlib.import_module("app.predict")
+
+    sys.modules.pop("app.predict", None)
+
+# test the memory-mapped model gives the same outputs as a normally loaded one
+def test_shared_model_matches_private_copy(tmp_path, load_predict):
+    reference = _write_checkpoint(tmp_path, 2, ["cat", "dog"]).eval()
+    predict = load_predict()
+
+    shared_model = predict._load_shared_model().eval()
+    private_model = predict._build_model(2, pretrained=False)
+    private_model.load_state_dict(torch.load(predict.MODEL_PATH))
+    private_model.eval()
+
+    inputs = torch.randn(2, 3, 64, 64)
+    with torch.no_grad():
+        expected = private_model(inputs)
+        assert torch.allclose(shared_model(inputs), expected)
+        assert torch.allclose(predict.model(inputs), expected)
+        assert torch.allclose(reference(inputs), expected)
+
+# test a checkpoint that does not match classes.txt falls back to a private copy
+def test_shared_model_falls_back_on_mismatch(tmp_path, load_predict, capsys):
+    _write_checkpoint(tmp_path, 2, ["cat", "dog", "bird"])
+    predict = load_predict()
+
+    output = capsys.readouterr().out
+    assert "falling back to private copy" in output
+    assert predict.model.fc.out_features == 3
+    assert not any(p.is_meta for p in predict.model.parameters())
+    with torch.no_grad():
+        assert predict.model(torch.randn(1, 3, 64, 64)).shape == (1, 3)
@@ -0,0 +1,103 @@
+import json
+import os
+import socket
+import sys
+import types
+import pytest
+
+torch = pytest.importorskip("torch")
+torchvision = pytest.importorskip("torchvision")
+
+import torch.multiprocessing as mp
+from PIL import Image
+
+WORLD_SIZE = 2
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _record(tmp_dir, rank, name, value):
+    with open(os.path.join(tmp_dir, f"{name}_rank{rank}.txt"), "a") as f:
+        f.write(f"{value}\n")
+
+def _worker(rank, world_size, tmp_dir):
+    # Runs in a spawned process: swap in a database stand-in, skip the ImageNet
+    # download and record what each rank samples, writes and registers
+    fake_db = types.ModuleType("app.db")
+    fake_db.insert_model = lambda name, filepath: _record(tmp_dir, rank, "insert_model", name) or 1
+    sys.modules["app.db"] = fake_db
+
+    from app import train
+
+    resnet50 = torchvision.models.resnet50
+    train.models.resnet50 = lambda weights=None: resnet50(weights=None)
+    train.epochs = 1
+    train.batch_size = 2
+    train.data_dir = os.path.join(tmp_dir, "train")
+    train.model_save_path = os.path.join(tmp_dir, "models", "my_model.pt")
+    train.CLASSES_PATH = os.path.join(tmp_dir, "models", "classes.txt")
+    train.VALIDATION_SPLIT_PATH = os.path.join(tmp_dir, "models", "val_split.txt")
+    train.TRAINED_MANIFEST_PATH = os.path.join(tmp_dir, "models", "trained_manifest.txt")
+
+    def recording(save):
+        def wrapper(data, path):
+            _record(tmp_dir, rank, "writes", os.path.basename(path))
+            return save(data, path)
+        return wrapper
+
+    train.save_checkpoint = recording(train.save_checkpoint)
+    train.save_classes = recording(train.save_classes)
+    train.save_samples = recording(train.save_samples)
+
+    class RecordingSampler(train.DistributedSampler):
+        def __iter__(self):
+            indices = list(super().__iter__())
+            _record(tmp_dir, self.rank, "shard", json.dumps([self.dataset.indices[i] for i in indices]))
+            return iter(indices)
+
+    train.DistributedSampler = RecordingSampler
+    train.train(rank, world_size, validation_split=0.2)
+
+def _read(tmp_path, name, rank):
+    path = tmp_path / f"{name}_rank{rank}.txt"
+    return path.read_text().splitlines() if path.exists() else []
+
+# test two gloo ranks shard the data and only rank 0 saves and registers
+def test_distributed_training_two_ranks(tmp_path, monkeypatch):
+    for label in ("cat", "dog"):
+        (tmp_path / "train" / label).mkdir(parents=True)
+        for i in range(5):
+            Image.new("RGB", (8, 8), (i * 50, 0, 0)).save(tmp_path / "train" / label / f"{i}.png")
+
+    monkeypatch.setenv("MASTER_ADDR", "127.0.0.1")
+    monkeypatch.setenv("MASTER_PORT", str(_free_port()))
+    mp.spawn(_worker, args=(WORLD_SIZE, str(tmp_path)), nprocs=WORLD_SIZE)
+
+    # Validation split: one image per class, written by rank 0 only
+    val_paths = [line.split("\t")[0] for line in (tmp_path / "models" / "val_split.txt").read_text().splitlines()]
+    assert sorted(os.path.basename(os.path.dirname(p)) for p in val_paths) == ["cat", "dog"]
+
+    samples = torchvision.datasets.ImageFolder(str(tmp_path / "train")).samples
+    train_indices = {i for i, (path, _) in enumerate(samples) if path not in val_paths}
+    assert len(train_indices) == 8
+
+    # Disjoint shards that together cover the training subset
+    shards = [json.loads(_read(tmp_path, "shard", rank)[0]) for rank in range(WORLD_SIZE)]
+    assert not set(shards[0]) & set(shards[1])
+    assert set(shards[0]) | set(shards[1]) == train_indices
+
+    # Rank 0 alone writes the checkpoint, classes, manifest and split, and registers the model
+    assert sorted(_read(tmp_path, "writes", 0)) == [
+        "classes.txt", "my_model.pt", "trained_manifest.txt", "val_split.txt"
+    ]
+    assert _read(tmp_path, "writes", 1) == []
+    assert _read(tmp_path, "insert_model", 0) == ["distributed_model"]
+    assert _read(tmp_path, "insert_model", 1) == []
+
+    state_dict = torch.load(tmp_path / "models" / "my_model.pt")
+    assert state_dict["fc.weight"].shape[0] == 2
+    manifest = (tmp_path / "models" / "trained_manifest.txt").read_text().splitlines()
+    assert len(manifest) == 8
+    assert not {line.split("\t")[0] for line in manifest} & set(val_paths)